@@ -1,9 +1,18 @@
 import os
+import asyncio
 import datetime
+import aiofiles
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 import shutil
 import re
+import hashlib
+import functools
+import heapq
+import tempfile
+from pathlib import Path
 from gtts import gTTS
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, ConversationHandler
@@ -18,6 +27,11 @@ logger = logging.getLogger(__name__)
 # Conversation states
 WAITING_FOR_DIARY, WAITING_FOR_AUDIO_CHOICE = range(2)
 
+# Message patterns, compiled once and shared by the filters and handlers
+HELLO_PATTERN = re.compile(r'(?i)^(hi|hello|hey)$')
+READ_PATTERN = re.compile(r'^/read_(\d{8})$')
+AUDIO_CHOICE_PATTERN = re.compile(r'^(Yes|No)')
+
 
 # === Load configuration ===
 def load_config():
@@ -26,13 +40,14 @@ def load_config():
         "openrouter_api_key": os.environ.get("OPEN_API_KEY", ""),
         "telegram_bot_token": os.environ.get("BOT_TOKEN", ""),
         "ai_model": os.environ.get("AI_MODEL", "openai/gpt-3.5-turbo"),
-        "allowed_user_ids": []
+        "allowed_user_ids": frozenset()
     }
 
     # Load allowed user IDs from environment variable (as comma-separated string)
+    # Stored as a frozenset so every authorization check is a hashed lookup
     allowed_ids = os.environ.get("ALLOWED_USER_IDS", "")
     if allowed_ids:
-        config["allowed_user_ids"] = [uid.strip() for uid in allowed_ids.split(",") if uid.strip()]
+        config["allowed_user_ids"] = frozenset(uid.strip() for uid in allowed_ids.split(",") if uid.strip())
 
     # Validate essential configuration
     if not config["telegram_bot_token"]:
@@ -51,35 +66,63 @@ config = load_config()
 
 
 # === User Authorization ===
+# Telegram user IDs are ints, so keep an int set to avoid a str() per check
+_AUTHORIZED_IDS_INT = frozenset(int(uid) for uid in config["allowed_user_ids"] if uid.isdigit())
+
+
 def is_authorized_user(user_id):
     """Check if a user is authorized to use the bot."""
-    return str(user_id) in config["allowed_user_ids"]
+    return user_id in _AUTHORIZED_IDS_INT
+
+
+def requires_auth(handler):
+    """Reject updates from unauthorized users before the handler runs."""
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        user_id = update.effective_user.id
+        if not is_authorized_user(user_id):
+            await update.message.reply_text(
+                f"🚫 Access Denied. Your user ID ({user_id}) is not authorized to use this bot."
+            )
+            # Ends the conversation for conversation entry points; ignored by plain handlers
+            return ConversationHandler.END
+        return await handler(update, context, *args, **kwargs)
+
+    return wrapper
 
 
 # === Secure path operations ===
-def ensure_folders_exist(date_obj):
+# Directories already created by this process, so repeat calls skip the mkdir syscalls
+_DIRS_SEEN = set()
+
+
+def _ensure(path):
+    """Create path once per process."""
+    if path not in _DIRS_SEEN:
+        os.makedirs(path, exist_ok=True)
+        _DIRS_SEEN.add(path)
+
+
+def ensure_folders_exist(month_folder, date_str):
     """Create necessary folder structure and return paths with proper sanitization."""
-    month_folder = date_obj.strftime("%B")  # e.g., "May"
+    # month_folder is e.g. "May", date_str is "%d-%m-%Y"
     diary_path = os.path.join("DATA", "Diary", month_folder)
-    audio_path = os.path.join("DATA", "Audio", date_obj.strftime("%d-%m-%Y"))
+    audio_path = os.path.join("DATA", "Audio", date_str)
 
-    os.makedirs(diary_path, exist_ok=True)
-    os.makedirs(audio_path, exist_ok=True)
+    _ensure(diary_path)
+    _ensure(audio_path)
 
     return diary_path, audio_path
 
 
 # === Save diary entry with enhanced security ===
-def save_diary_entry(user_id, entry_text):
-    """Save diary entry with proper input sanitization."""
-    today = datetime.datetime.now()
-    diary_path, _ = ensure_folders_exist(today)
-
+def save_diary_entry(user_id, entry_text, diary_path, day):
+    """Save diary entry into diary_path with proper input sanitization."""
     # Sanitize user_id to ensure it's only digits
     safe_user_id = re.sub(r'[^\d]', '', str(user_id))
 
     # Create user-specific file
-    day_file = f"{today.strftime('%d')}_{safe_user_id}.txt"
+    day_file = f"{day}_{safe_user_id}.txt"
     file_path = os.path.join(diary_path, day_file)
 
     with open(file_path, "w", encoding="utf-8") as f:
@@ -88,7 +131,222 @@ def save_diary_entry(user_id, entry_text):
     return file_path
 
 
+# === Diary journal ===
+# One append-only JSON-lines log per user: {"date", "display", "rating", "summary", "gratitude"} per line.
+# A later line for the same date supersedes earlier ones.
+DIARY_DIR = os.path.join("DATA", "DiaryEntries")
+
+# Per-user {date: (display date, rating)} for /mydiary, filled from the journal on first use
+# and kept current on save
+_DIARY_INDEX = {}
+# Users whose journal has been read into _DIARY_INDEX
+_DIARY_INDEX_LOADED = set()
+
+
+def _diary_log_path(safe_user_id):
+    """Return the path of the user's diary journal."""
+    # Plain f-string join: safe_user_id is digits only, so no normalization is needed
+    return f"{DIARY_DIR}/{safe_user_id}.jsonl"
+
+
+# Users whose journal has appends not yet fsynced; flushed in batches by _periodic_fsync
+_pending_syncs = set()
+FSYNC_INTERVAL_SECONDS = 5
+
+
+async def _append_diary_record(safe_user_id, record):
+    """Append one diary record to the user's journal with a single write."""
+    # Deliberately no fsync here: durability is batched by _periodic_fsync, and the
+    # Telegram confirmation is not a durability guarantee
+    # The whole record goes out as one buffered write; never write it piecemeal
+    async with aiofiles.open(_diary_log_path(safe_user_id), "ab", buffering=65536) as f:
+        await f.write(orjson.dumps(record) + b"\n")
+    _pending_syncs.add(safe_user_id)
+
+
+def _fsync_path(path):
+    """Flush a file's written data to disk."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+async def _sync_pending_journals():
+    """fsync every journal appended to since the last sync."""
+    while _pending_syncs:
+        safe_user_id = _pending_syncs.pop()
+        try:
+            await asyncio.to_thread(_fsync_path, _diary_log_path(safe_user_id))
+        except OSError as e:
+            logger.error(f"Error syncing diary journal for user {safe_user_id}: {e}")
+
+
+async def _periodic_fsync():
+    """Background task that batches journal fsyncs every FSYNC_INTERVAL_SECONDS."""
+    while True:
+        await asyncio.sleep(FSYNC_INTERVAL_SECONDS)
+        await _sync_pending_journals()
+
+
+def _read_diary_records(path, safe_user_id):
+    """Parse a journal file into records keyed by date; runs in a worker thread."""
+    records = {}
+    try:
+        # Stream line by line rather than holding the whole journal in memory
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = orjson.loads(line)
+                    records[record["date"]] = record
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.error(f"Skipping malformed diary record for user {safe_user_id}: {e}")
+    except FileNotFoundError:
+        return {}
+    return records
+
+
+async def _load_diary_records(safe_user_id):
+    """Return the user's diary records keyed by date, latest save winning."""
+    # One thread hop for the whole file instead of one per line
+    return await asyncio.to_thread(_read_diary_records, _diary_log_path(safe_user_id), safe_user_id)
+
+
+def _read_latest_record(path, needle, date_str):
+    """Return the newest valid journal record for date_str, or None; runs in a worker thread."""
+    latest = None
+    try:
+        # Stream line by line rather than holding the whole journal in memory; only lines
+        # mentioning the date are decoded, and a later valid one supersedes earlier ones
+        with open(path, "rb") as f:
+            for line in f:
+                if needle not in line:
+                    continue
+                try:
+                    record = orjson.loads(line)
+                except ValueError:
+                    # A torn or corrupt line must not hide an earlier good save of the same day
+                    continue
+                if isinstance(record, dict) and record.get("date") == date_str:
+                    latest = record
+    except FileNotFoundError:
+        return None
+    return latest
+
+
+async def _find_diary_record(safe_user_id, date_str):
+    """Return the latest diary record for date_str, or None if there is none."""
+    needle = f'"date":"{date_str}"'.encode()
+    return await asyncio.to_thread(_read_latest_record, _diary_log_path(safe_user_id), needle, date_str)
+
+
+# Per-day files written before the journal: <date>_diary.txt (no user ID) and,
+# briefly, <date>_<user_id>[_r<rating>]_diary.txt
+_LEGACY_DIARY_NAME_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})(?:_(\d+))?(?:_r\d+)?_diary\.txt$')
+
+
+def _parse_legacy_diary(date_str, content):
+    """Turn a legacy per-day diary file back into a journal record."""
+    record = {"date": date_str, "rating": "?", "summary": content, "gratitude": "None noted."}
+
+    # Layout: "Diary Entry: <display>\n\nDay Rating: <n>/10\n\n<summary>\n\nGratitude:\n<gratitude>"
+    header, _, rest = content.partition("\n\n")
+    if not header.startswith("Diary Entry: "):
+        return record
+    record["display"] = header[len("Diary Entry: "):]
+
+    if rest.startswith("Day Rating:"):
+        rating_line, _, rest = rest.partition("\n\n")
+        rating_match = _RATING_RE.search(rating_line)
+        if rating_match:
+            record["rating"] = int(rating_match.group(1))
+
+    summary, sep, gratitude = rest.partition("\n\nGratitude:\n")
+    record["summary"] = summary
+    if sep:
+        record["gratitude"] = gratitude
+    return record
+
+
+def _import_legacy_diaries():
+    """One-time import of legacy per-day diary files into each user's journal.
+
+    Files without a user ID are only imported when exactly one user is allowed.
+    Imported files are renamed to *.imported so they are kept but not read again.
+    """
+    if not os.path.isdir(DIARY_DIR):
+        return
+    sole_user = str(next(iter(_AUTHORIZED_IDS_INT))) if len(_AUTHORIZED_IDS_INT) == 1 else None
+
+    pending = {}
+    with os.scandir(DIARY_DIR) as it:
+        for entry in it:
+            name_match = _LEGACY_DIARY_NAME_RE.match(entry.name)
+            if not name_match or not entry.is_file():
+                continue
+            safe_user_id = name_match.group(2) or sole_user
+            if safe_user_id is None:
+                logger.warning(f"Not importing {entry.name}: it has no user ID and more than one user is allowed")
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    record = _parse_legacy_diary(name_match.group(1), f.read())
+            except OSError as e:
+                logger.error(f"Error reading legacy diary file {entry.name}: {e}")
+                continue
+            pending.setdefault(safe_user_id, []).append((entry.path, record))
+
+    for safe_user_id, items in pending.items():
+        # Later journal lines win, so never let an old file shadow a date the journal already has
+        journal_path = _diary_log_path(safe_user_id)
+        known_dates = set(_read_diary_records(journal_path, safe_user_id))
+        items.sort(key=lambda item: item[1]["date"])
+        with open(journal_path, "ab") as f:
+            for _, record in items:
+                if record["date"] not in known_dates:
+                    f.write(orjson.dumps(record) + b"\n")
+                    known_dates.add(record["date"])
+        for path, _ in items:
+            os.replace(path, f"{path}.imported")
+        logger.info(f"Imported {len(items)} legacy diary file(s) for user {safe_user_id}")
+
+
+def _display_date(record):
+    """Return the record's display date (e.g. "Monday, May 05, 2025")."""
+    # Records saved before the display date was stored need it formatted here
+    if "display" in record:
+        return record["display"]
+    try:
+        return datetime.datetime.strptime(record["date"], '%Y-%m-%d').strftime('%A, %B %d, %Y')
+    except ValueError:
+        return record["date"]
+
+
+def _format_diary_record(record):
+    """Render a diary record the way entries are shown by /read."""
+    return (
+        f"Diary Entry: {_display_date(record)}\n\n"
+        f"Day Rating: {record['rating']}/10\n\n"
+        f"{record['summary']}\n\n"
+        f"Gratitude:\n{record['gratitude']}"
+    )
+
+
+async def _write_file(path, content):
+    """Write a UTF-8 text file without blocking the event loop."""
+    async with aiofiles.open(path, "w", encoding="utf-8") as f:
+        await f.write(content)
+
+
 # === Load user bio with security measures ===
+@functools.lru_cache(maxsize=256)
+def _read_bio_cached(path, mtime):
+    """Read a bio file; mtime is part of the cache key so edits invalidate it."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
 def load_user_bio(user_id):
     """Load user bio with proper input validation."""
     # Sanitize user_id to prevent path traversal attacks
@@ -99,29 +357,78 @@ def load_user_bio(user_id):
 
     if os.path.exists(user_bio_path) and os.path.isfile(user_bio_path):
         try:
-            with open(user_bio_path, "r", encoding="utf-8") as f:
-                return f.read()
+            return _read_bio_cached(user_bio_path, os.path.getmtime(user_bio_path))
         except Exception as e:
             logger.error(f"Error loading user bio: {e}")
 
     # Fall back to default bio if user-specific one doesn't exist
     default_bio_path = os.path.join("DATA", "Bio.txt")
     try:
-        with open(default_bio_path, "r", encoding="utf-8") as f:
-            return f.read()
+        return _read_bio_cached(default_bio_path, os.path.getmtime(default_bio_path))
     except FileNotFoundError:
         # Return empty bio if no files exist
         logger.warning(f"No bio found for user {user_id}. Using empty bio.")
         return "No personal information available yet."
 
 
+# === Analysis prompt ===
+# Balanced, practical assessment; filled in per entry with format_map
+_PROMPT_TEMPLATE = """You are a compassionate and balanced life coach who understands that being human means balancing productivity with rest, achievements with joy, and goals with reality. Analyze this daily narration with both wisdom and empathy.
+
+USER BIO: {bio}
+
+TODAY'S JOURNAL ENTRY ({date_str}): {diary_text}
+
+Provide a balanced analysis with these clearly labeled sections:
+
+GRATITUDE:
+Identify 2-3 specific things from the day that deserve gratitude or appreciation, even if the day was challenging.
+
+TIME INEFFICIENCY: 
+Gently identify moments where time could have been used more effectively, but remember that not every minute needs to be productive. Be understanding that humans need downtime too.
+
+GOOD USE OF TIME: 
+Highlight specific periods that were productive, focused, meaningful, or even just restorative rest time. Note what made these moments valuable.
+
+MEMORABLE MOMENTS: 
+Point out any joyful, reflective, or learning-based events worth remembering from the day.
+
+SUGGESTIONS FOR IMPROVEMENT: 
+Offer 1-2 practical and realistic improvements:
+- Focus on small, doable changes
+- Suggest specific techniques when appropriate
+- Balance ambition with self-compassion
+- Include wisdom from various philosophies when they fit naturally
+
+HABIT PATTERN ANALYSIS: 
+Detect recurring habits (good or bad) and explain how they're shaping personal growth, without judgment.
+
+DAY SUMMARY (AS A STORY): 
+Write a refined, empathetic narrative of how the day unfolded:
+- Use a human, reflective tone
+- Preserve the sequence and emotions conveyed
+- Balance achievements with human moments
+- This is the version to be saved in the daily diary log
+
+DAY RATING:
+On a scale of 1-10, provide a balanced rating of the day, where 5-6 is a normal day, 10 is exceptional, and 1 is truly terrible. Include "/10" after the number.
+
+Make each section clear with headers. Be direct but compassionate.
+"""
+
+
 # === Analyze diary entry with AI and improved error handling ===
+# Shared session so keep-alive connections (and their TLS handshakes) are reused across entries
+_SESSION = requests.Session()
+_SESSION.headers.update({"Content-Type": "application/json"})
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+
 def analyze_day_with_openrouter(prompt_text):
     """Analyze diary entry with OpenRouter API and robust error handling."""
     url = "https://openrouter.ai/api/v1/chat/completions"
     headers = {
-        "Authorization": f"Bearer {config['openrouter_api_key']}",
-        "Content-Type": "application/json"
+        "Authorization": f"Bearer {config['openrouter_api_key']}"
     }
 
     # Improved prompt structure for better analysis
@@ -131,9 +438,10 @@ def analyze_day_with_openrouter(prompt_text):
     }
 
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
+        # Content-Type: application/json is set on the session
+        response = _SESSION.post(url, headers=headers, data=orjson.dumps(payload), timeout=60)
         response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+        return orjson.loads(response.content)["choices"][0]["message"]["content"]
     except requests.exceptions.Timeout:
         logger.error("OpenRouter API request timed out.")
         return "I'm sorry, the analysis service took too long to respond. Please try again later."
@@ -149,6 +457,32 @@ def analyze_day_with_openrouter(prompt_text):
 
 
 # === Parse feedback into sections with enhanced robustness ===
+# Headers the AI may use for each section
+_SECTIONS_TO_FIND = {
+    "gratitude": ["GRATITUDE:", "THINGS TO BE GRATEFUL FOR:"],
+    "time_wasted": ["TIME INEFFICIENCY:", "TIME WASTED:"],
+    "good_use": ["GOOD USE OF TIME:", "GOOD USE:"],
+    "memorable_moments": ["MEMORABLE MOMENTS:"],
+    "suggestions": ["SUGGESTIONS FOR IMPROVEMENT:", "SUGGESTIONS:"],
+    "habit_patterns": ["HABIT PATTERN ANALYSIS:"],
+    "day_summary": ["DAY SUMMARY", "DAY SUMMARY (AS A STORY):"],
+    "day_rating": ["DAY RATING:", "RATING:"]
+}
+
+_HEADER_TO_KEY = {header: key for key, headers in _SECTIONS_TO_FIND.items() for header in headers}
+
+# Longest headers first so e.g. "DAY SUMMARY (AS A STORY):" wins over its "DAY SUMMARY" prefix
+_HEADER_RE = re.compile(
+    "(" + "|".join(re.escape(h) for h in sorted(_HEADER_TO_KEY, key=len, reverse=True)) + ")"
+)
+
+# Filler used for sections the AI response didn't cover
+_NO_POINTS_TEXT = "No specific points mentioned."
+
+# Numeric rating, optionally followed by "/10" (e.g. "8/10" -> "8")
+_RATING_RE = re.compile(r'(\d+)(?:\s*/\s*10)?')
+
+
 def parse_feedback(text):
     """Parse AI feedback into organized sections with improved parsing logic."""
     sections = {
@@ -162,43 +496,20 @@ def parse_feedback(text):
         "day_rating": "7"  # Default rating if none found
     }
 
-    # Try to find specifically formatted sections
-    sections_to_find = {
-        "gratitude": ["GRATITUDE:", "THINGS TO BE GRATEFUL FOR:"],
-        "time_wasted": ["TIME INEFFICIENCY:", "TIME WASTED:"],
-        "good_use": ["GOOD USE OF TIME:", "GOOD USE:"],
-        "memorable_moments": ["MEMORABLE MOMENTS:"],
-        "suggestions": ["SUGGESTIONS FOR IMPROVEMENT:", "SUGGESTIONS:"],
-        "habit_patterns": ["HABIT PATTERN ANALYSIS:"],
-        "day_summary": ["DAY SUMMARY", "DAY SUMMARY (AS A STORY):"],
-        "day_rating": ["DAY RATING:", "RATING:"]
-    }
-
-    # First attempt: Look for each section specifically
-    for section_key, possible_headers in sections_to_find.items():
-        for header in possible_headers:
-            if header in text:
-                parts = text.split(header, 1)
-                if len(parts) > 1:
-                    # Find the end of this section (next section header or end of text)
-                    section_content = parts[1]
-                    end_pos = len(section_content)
-
-                    # Check if any other section header appears after this one
-                    for next_header in [h for headers in sections_to_find.values() for h in headers]:
-                        if next_header in section_content:
-                            pos = section_content.find(next_header)
-                            if pos < end_pos:
-                                end_pos = pos
-
-                    # Extract just this section's content
-                    sections[section_key] = section_content[:end_pos].strip()
-                    break
+    # Tokenize once into [preamble, header1, body1, header2, body2, ...]
+    parts = _HEADER_RE.split(text)
+    found = set()
+    for header, body in zip(parts[1::2], parts[2::2]):
+        section_key = _HEADER_TO_KEY[header]
+        # Keep the first occurrence of each section
+        if section_key not in found:
+            found.add(section_key)
+            sections[section_key] = body.strip()
 
     # Special handling for rating to ensure it's a number
     if sections["day_rating"]:
         # Try to extract just the numeric rating (e.g., "8/10" -> "8")
-        rating_match = re.search(r'(\d+)(?:/10)?', sections["day_rating"])
+        rating_match = _RATING_RE.search(sections["day_rating"])
         if rating_match:
             sections["day_rating"] = rating_match.group(1)
         else:
@@ -210,7 +521,7 @@ def parse_feedback(text):
             if key == "day_rating":
                 sections[key] = "7"  # Default rating
             else:
-                sections[key] = "No specific points mentioned."
+                sections[key] = _NO_POINTS_TEXT
 
     # Validate day rating is between 1-10
     try:
@@ -223,62 +534,148 @@ def parse_feedback(text):
     return sections
 
 
+# === Cached text-to-speech ===
+# Only fixed strings that recur across entries are cached; diary-specific text is private
+# and practically never repeats, so it is synthesized straight into the per-day folder
+_CACHEABLE_TTS_TEXTS = frozenset({_NO_POINTS_TEXT})
+
+
+def _tts_cache_path(text, lang):
+    """Return the cache location for the synthesized audio of text in lang."""
+    digest = hashlib.sha256(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+    return os.path.join("DATA", "AudioCache", f"{digest}.mp3")
+
+
+def _link_or_copy(src, dst):
+    """Hard-link src to dst, falling back to a copy across filesystems."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
 # === Create audio files with better error handling ===
-def create_audio_files(sections, audio_path):
-    """Create audio files with improved error handling."""
-    audio_files = {}
+def _synth(section_name, content, audio_path):
+    """Synthesize one section into audio_path and return (section_name, file_path or None)."""
+    file_path = os.path.join(audio_path, f"{section_name}.mp3")
 
-    for section_name, content in sections.items():
-        # Skip creating audio for the rating
-        if section_name == "day_rating":
-            continue
+    try:
+        if content not in _CACHEABLE_TTS_TEXTS:
+            gTTS(text=content, lang='en').save(file_path)
+            return section_name, file_path
+
+        # Only hit the TTS service when this fixed text hasn't been synthesized before
+        cache_path = _tts_cache_path(content, 'en')
+        if not os.path.exists(cache_path):
+            # Write to a temp file first so a failed download never leaves a truncated cache entry
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(cache_path))
+            os.close(fd)
+            try:
+                gTTS(text=content, lang='en').save(tmp_path)
+                os.replace(tmp_path, cache_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        _link_or_copy(cache_path, file_path)
+        return section_name, file_path
+    except Exception as e:
+        logger.error(f"Error creating audio for {section_name}: {e}")
+        # Continue with other sections even if one fails
+        return section_name, None
 
-        filename = f"{section_name}.mp3"
-        file_path = os.path.join(audio_path, filename)
 
-        try:
-            tts = gTTS(text=content, lang='en')
-            tts.save(file_path)
-            audio_files[section_name] = file_path
-        except Exception as e:
-            logger.error(f"Error creating audio for {section_name}: {e}")
-            # Continue with other sections even if one fails
+async def create_audio_files(sections, audio_path):
+    """Create audio files concurrently with improved error handling."""
+    await asyncio.to_thread(_ensure, os.path.join("DATA", "AudioCache"))
+    # Not memoized: the shared per-day folder may have been removed by another user's cleanup
+    # since process_diary_entry created it
+    await asyncio.to_thread(os.makedirs, audio_path, exist_ok=True)
+
+    # Each synthesis is a blocking HTTPS round-trip, so run them side by side off the event loop
+    # (skipping the rating, which has no audio)
+    tasks = [
+        asyncio.to_thread(_synth, section_name, content, audio_path)
+        for section_name, content in sections.items()
+        if section_name != "day_rating"
+    ]
+    results = await asyncio.gather(*tasks)
 
-    return audio_files
+    return {section_name: file_path for section_name, file_path in results if file_path}
 
 
 # === Clean up audio files ===
+def _rm(audio_path):
+    """Remove the audio folder, logging instead of raising."""
+    try:
+        if os.path.exists(audio_path):
+            try:
+                shutil.rmtree(audio_path)
+                logger.info(f"Cleaned up audio files in {audio_path}")
+            except Exception as e:
+                logger.error(f"Error cleaning up audio files: {e}")
+    finally:
+        # Forget the folder only once it is gone; forgetting it earlier lets another user's
+        # _ensure re-mark it as existing just before rmtree deletes it
+        _DIRS_SEEN.discard(audio_path)
+
+
 def cleanup_audio_files(audio_path):
-    """Delete audio files after they've been sent"""
-    if os.path.exists(audio_path):
-        try:
-            shutil.rmtree(audio_path)
-            logger.info(f"Cleaned up audio files in {audio_path}")
-        except Exception as e:
-            logger.error(f"Error cleaning up audio files: {e}")
+    """Delete audio files after they've been sent, in the background.
+
+    Returns a future; callers that need the folder gone before continuing should await it.
+    """
+    return asyncio.get_running_loop().run_in_executor(None, _rm, audio_path)
 
 
 # === Format message for Telegram ===
+# Markdown special characters and their escaped forms
+_MARKDOWN_ESCAPES = str.maketrans({"_": "\\_", "*": "\\*", "`": "\\`", "[": "\\["})
+
+# Display titles for each analysis section, in the order they are sent
+_SECTION_TITLES = {
+    "gratitude": "🙏 Gratitude - Things to be thankful for",
+    "time_wasted": "⏱️ Time Inefficiency - Where time could be better used",
+    "good_use": "✅ Good Use of Time - Valuable periods",
+    "memorable_moments": "🌟 Memorable Moments - Worth remembering",
+    "suggestions": "📈 Gentle Suggestions for Improvement",
+    "habit_patterns": "🔁 Habit Pattern Insights",
+    "day_summary": "📝 Day Summary (as a Story)"
+}
+
+
 def format_section_message(title, content, date_str):
     """Format message for Telegram with proper character escaping."""
-    # Escape Markdown special characters to prevent formatting issues
-    safe_content = content.replace("_", "\\_").replace("*", "\\*").replace("`", "\\`").replace("[", "\\[")
+    # Escape Markdown special characters in a single pass to prevent formatting issues
+    safe_content = content.translate(_MARKDOWN_ESCAPES)
 
     return f"📅 *Daily Analysis for {date_str}*\n\n*{title}*\n\n{safe_content}"
 
 
+def _chunks(text, limit=4000):
+    """Yield pieces of text up to limit characters, breaking at paragraph boundaries when possible."""
+    i = 0
+    n = len(text)
+    while i < n:
+        j = min(i + limit, n)
+        next_start = j
+        if j < n:
+            k = text.rfind("\n\n", i, j)
+            if k > i:
+                # Cut before the blank line and drop it from the next piece
+                j = k
+                next_start = k + 2
+        yield text[i:j]
+        i = next_start
+
+
 # === Telegram Bot Command Handlers ===
+@requires_auth
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a welcome message when the command /start is issued."""
     user = update.effective_user
 
-    # Check authorization
-    if not is_authorized_user(user.id):
-        await update.message.reply_text(
-            f"🚫 Access Denied. Your user ID ({user.id}) is not authorized to use this bot."
-        )
-        return
-
     await update.message.reply_text(
         f"👋 Hi {user.first_name}! Welcome to your Daily Reflection Bot.\n\n"
         "I'll help you track your daily activities and provide thoughtful insights.\n\n"
@@ -291,17 +688,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     )
 
 
+@requires_auth
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a detailed help message when the command /help is issued."""
-    user = update.effective_user
-
-    # Check authorization
-    if not is_authorized_user(user.id):
-        await update.message.reply_text(
-            f"🚫 Access Denied. Your user ID ({user.id}) is not authorized to use this bot."
-        )
-        return
-
     help_text = (
         "📔 *Daily Reflection Bot Commands*\n\n"
         "🚀 *Basic Commands*\n"
@@ -321,21 +710,15 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await update.message.reply_text(help_text, parse_mode="Markdown")
 
 
+@requires_auth
 async def set_bio(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Set or update user's personal bio information."""
     user = update.effective_user
     user_id = user.id
 
-    # Check authorization
-    if not is_authorized_user(user_id):
-        await update.message.reply_text(
-            f"🚫 Access Denied. Your user ID ({user_id}) is not authorized to use this bot."
-        )
-        return
-
     if not context.args:
         # No arguments provided, show instructions
-        current_bio = load_user_bio(user_id)
+        current_bio = await asyncio.to_thread(load_user_bio, user_id)
 
         await update.message.reply_text(
             "📋 *Personal Bio Setup*\n\n"
@@ -363,11 +746,13 @@ async def set_bio(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     safe_user_id = re.sub(r'[^\d]', '', str(user_id))
 
     # Ensure user directory exists
-    os.makedirs(os.path.join("DATA", "Users"), exist_ok=True)
+    await asyncio.to_thread(os.makedirs, os.path.join("DATA", "Users"), exist_ok=True)
 
     # Save the bio
-    with open(os.path.join("DATA", "Users", f"{safe_user_id}_bio.txt"), "w", encoding="utf-8") as f:
-        f.write(bio_text)
+    await _write_file(os.path.join("DATA", "Users", f"{safe_user_id}_bio.txt"), bio_text)
+
+    # mtime may not change within the filesystem's timestamp resolution, so drop cached bios explicitly
+    _read_bio_cached.cache_clear()
 
     await update.message.reply_text(
         "✅ *Bio updated successfully!*\n\n"
@@ -378,17 +763,9 @@ async def set_bio(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 
 # === Conversation flow handlers ===
+@requires_auth
 async def handle_hello(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle 'hi' messages and start the diary conversation."""
-    user = update.effective_user
-
-    # Check authorization
-    if not is_authorized_user(user.id):
-        await update.message.reply_text(
-            f"🚫 Access Denied. Your user ID ({user.id}) is not authorized to use this bot."
-        )
-        return ConversationHandler.END
-
     reply_keyboard = [["Skip - I'll type it"]]
 
     await update.message.reply_text(
@@ -399,17 +776,9 @@ async def handle_hello(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     return WAITING_FOR_DIARY
 
 
+@requires_auth
 async def start_diary(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Begin a new diary entry conversation flow."""
-    user = update.effective_user
-
-    # Check authorization
-    if not is_authorized_user(user.id):
-        await update.message.reply_text(
-            f"🚫 Access Denied. Your user ID ({user.id}) is not authorized to use this bot."
-        )
-        return ConversationHandler.END
-
     reply_keyboard = [["Skip - I'll type it"]]
 
     await update.message.reply_text(
@@ -455,73 +824,34 @@ async def process_diary_entry(update: Update, context: ContextTypes.DEFAULT_TYPE
     processing_message = await update.message.reply_text("📝 Processing your diary entry...")
 
     # Save diary entry
+    # Format the date parts once and pass them through
     today = datetime.datetime.now()
-    date_str = today.strftime("%d-%m-%Y")
-    file_path = save_diary_entry(user_id, diary_text)
-    diary_path, audio_path = ensure_folders_exist(today)
+    day = today.strftime("%d")
+    month = today.strftime("%B")
+    date_str = f"{day}-{today.strftime('%m-%Y')}"
+    # Filesystem work runs in worker threads so the event loop keeps serving other users
+    diary_path, audio_path = await asyncio.to_thread(ensure_folders_exist, month, date_str)
+    file_path = await asyncio.to_thread(save_diary_entry, user_id, diary_text, diary_path, day)
 
     # Load bio
-    bio = load_user_bio(user_id)
+    bio = await asyncio.to_thread(load_user_bio, user_id)
 
     # Prepare improved prompt based on more practical, balanced assessment
-    prompt = f"""You are a compassionate and balanced life coach who understands that being human means balancing productivity with rest, achievements with joy, and goals with reality. Analyze this daily narration with both wisdom and empathy.
-
-USER BIO: {bio}
-
-TODAY'S JOURNAL ENTRY ({date_str}): {diary_text}
-
-Provide a balanced analysis with these clearly labeled sections:
-
-GRATITUDE:
-Identify 2-3 specific things from the day that deserve gratitude or appreciation, even if the day was challenging.
-
-TIME INEFFICIENCY: 
-Gently identify moments where time could have been used more effectively, but remember that not every minute needs to be productive. Be understanding that humans need downtime too.
-
-GOOD USE OF TIME: 
-Highlight specific periods that were productive, focused, meaningful, or even just restorative rest time. Note what made these moments valuable.
-
-MEMORABLE MOMENTS: 
-Point out any joyful, reflective, or learning-based events worth remembering from the day.
-
-SUGGESTIONS FOR IMPROVEMENT: 
-Offer 1-2 practical and realistic improvements:
-- Focus on small, doable changes
-- Suggest specific techniques when appropriate
-- Balance ambition with self-compassion
-- Include wisdom from various philosophies when they fit naturally
-
-HABIT PATTERN ANALYSIS: 
-Detect recurring habits (good or bad) and explain how they're shaping personal growth, without judgment.
-
-DAY SUMMARY (AS A STORY): 
-Write a refined, empathetic narrative of how the day unfolded:
-- Use a human, reflective tone
-- Preserve the sequence and emotions conveyed
-- Balance achievements with human moments
-- This is the version to be saved in the daily diary log
-
-DAY RATING:
-On a scale of 1-10, provide a balanced rating of the day, where 5-6 is a normal day, 10 is exceptional, and 1 is truly terrible. Include "/10" after the number.
-
-Make each section clear with headers. Be direct but compassionate.
-"""
+    prompt = _PROMPT_TEMPLATE.format_map({"bio": bio, "date_str": date_str, "diary_text": diary_text})
 
     # Get AI analysis
     await update.message.reply_text("🔍 Analyzing your day...")
-    feedback_text = analyze_day_with_openrouter(prompt)
+    # Run the blocking API call in a worker thread so other users' updates keep being handled
+    feedback_text = await asyncio.to_thread(analyze_day_with_openrouter, prompt)
 
     # Parse feedback
     sections = parse_feedback(feedback_text)
 
-    # Save the complete feedback for reference
-    # Sanitize user_id to prevent path traversal
-    safe_user_id = re.sub(r'[^\d]', '', str(user_id))
-    feedback_path = os.path.join(diary_path, f"{today.strftime('%d')}_{safe_user_id}_analysis.txt")
+    # Save the complete feedback for reference next to the (already sanitized) diary file
+    feedback_path = f"{os.path.splitext(file_path)[0]}_analysis.txt"
 
     try:
-        with open(feedback_path, "w", encoding="utf-8") as f:
-            f.write(feedback_text)
+        await _write_file(feedback_path, feedback_text)
     except Exception as e:
         logger.error(f"Error saving analysis: {e}")
 
@@ -552,22 +882,12 @@ async def send_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     date_str = analysis_data.get("date_str", datetime.datetime.now().strftime("%d-%m-%Y"))
     audio_path = analysis_data.get("audio_path", "")
 
-    section_titles = {
-        "gratitude": "🙏 Gratitude - Things to be thankful for",
-        "time_wasted": "⏱️ Time Inefficiency - Where time could be better used",
-        "good_use": "✅ Good Use of Time - Valuable periods",
-        "memorable_moments": "🌟 Memorable Moments - Worth remembering",
-        "suggestions": "📈 Gentle Suggestions for Improvement",
-        "habit_patterns": "🔁 Habit Pattern Insights",
-        "day_summary": "📝 Day Summary (as a Story)"
-    }
-
     # Create audio files if requested (silently - no message)
     audio_files = {}
     if want_audio:
         try:
             # Create separate audio files for each section
-            audio_files = create_audio_files(sections, audio_path)
+            audio_files = await create_audio_files(sections, audio_path)
         except Exception as e:
             logger.error(f"Error creating audio files: {e}")
             await update.message.reply_text(
@@ -576,7 +896,7 @@ async def send_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
             want_audio = False
 
     # Send each section
-    for section_key, title in section_titles.items():
+    for section_key, title in _SECTION_TITLES.items():
         content = sections.get(section_key, "No analysis available.")
 
         # Limit content length to prevent message too long errors
@@ -601,9 +921,9 @@ async def send_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         # Send audio if requested - directly after each text section
         if want_audio and section_key in audio_files:
             try:
-                with open(audio_files[section_key], "rb") as audio:
-                    # Send audio without any introduction text
-                    await update.message.reply_voice(audio, caption=f"{title.split('-')[0].strip()}")
+                audio = await asyncio.to_thread(Path(audio_files[section_key]).read_bytes)
+                # Send audio without any introduction text
+                await update.message.reply_voice(audio, caption=f"{title.split('-')[0].strip()}")
             except Exception as e:
                 logger.error(f"Error sending audio file: {e}")
 
@@ -624,34 +944,34 @@ async def send_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         logger.error(f"Error sending rating message: {e}")
 
     # Also create a diary entry from the day summary
+    # Format each date representation once
     today = datetime.datetime.now()
-    diary_dir = os.path.join("DATA", "DiaryEntries")
-    os.makedirs(diary_dir, exist_ok=True)
-
-    # Format the diary entry filename with date and user ID
-    #safe_user_id = re.sub(r'[^\d]', '', str(user.id))
-    diary_filename = f"{today.strftime('%Y-%m-%d')}_diary.txt"
-    diary_file_path = os.path.join(diary_dir, diary_filename)
-
-    # Get the day summary content
-    day_summary = sections.get("day_summary", "No day summary available.")
-
-    # Format the diary entry with header and rating
-    diary_content = (
-        f"Diary Entry: {today.strftime('%A, %B %d, %Y')}\n\n"
-        f"Day Rating: {rating}/10\n\n"
-        f"{day_summary}\n\n"
-        f"Gratitude:\n{sections.get('gratitude', 'None noted.')}"
-    )
+    iso_date = today.strftime('%Y-%m-%d')
+    long_date = today.strftime('%A, %B %d, %Y')
+    short_date = today.strftime('%A, %B %d')
+    await asyncio.to_thread(os.makedirs, DIARY_DIR, exist_ok=True)
+
+    # Sanitize user_id to prevent path traversal
+    safe_user_id = re.sub(r'[^\d]', '', str(update.effective_user.id))
+
+    # The diary record keeps the day summary, rating and gratitude
+    record = {
+        "date": iso_date,
+        "display": long_date,
+        "rating": rating,
+        "summary": sections.get("day_summary", "No day summary available."),
+        "gratitude": sections.get("gratitude", "None noted.")
+    }
 
-    # Save the diary entry
+    # Save the diary entry by appending it to the user's journal
     try:
-        with open(diary_file_path, "w", encoding="utf-8") as f:
-            f.write(diary_content)
+        await _append_diary_record(safe_user_id, record)
+        # Record it even before the journal is first read, so a load in flight can't drop it
+        _DIARY_INDEX.setdefault(safe_user_id, {})[iso_date] = (long_date, rating)
 
         # Inform the user
         await update.message.reply_text(
-            f"✍️ Your digital diary entry for {today.strftime('%A, %B %d')} has been saved."
+            f"✍️ Your digital diary entry for {short_date} has been saved."
         )
     except Exception as e:
         logger.error(f"Error saving diary entry: {e}")
@@ -659,7 +979,7 @@ async def send_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
             "There was an issue saving your diary entry. Your analysis is still complete though!"
         )
 
-    # Clean up audio files if they were created
+    # Clean up audio files if they were created (runs in the background; nothing below needs them gone)
     if want_audio:
         cleanup_audio_files(audio_path)
 
@@ -684,95 +1004,52 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return ConversationHandler.END
 
 
+@requires_auth
 async def show_diary(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show the diary entries available for the user."""
-    user = update.effective_user
-    user_id = user.id
-
-    # Check authorization
-    if not is_authorized_user(user_id):
-        await update.message.reply_text(
-            f"🚫 Access Denied. Your user ID ({user_id}) is not authorized to use this bot."
-        )
-        return
-
-    # Path to diary entries
-    diary_dir = os.path.join("DATA", "DiaryEntries")
-
-    # Check if directory exists
-    if not os.path.exists(diary_dir):
-        await update.message.reply_text("No diary entries found yet. Start by creating your first entry!")
-        return
-
-    # Get all diary entries
-    entries = []
-    try:
-        for filename in os.listdir(diary_dir):
-            if filename.endswith("_diary.txt"):
-                # Extract date from filename
-                date_match = re.match(r'(\d{4}-\d{2}-\d{2})_', filename)
-                if date_match:
-                    date_str = date_match.group(1)
-                    entries.append((date_str, filename))
-    except Exception as e:
-        logger.error(f"Error reading diary directory: {e}")
-        await update.message.reply_text("Error retrieving diary entries. Please try again later.")
-        return
-
-    # Sort entries by date (newest first)
-    entries.sort(reverse=True)
+    # Sanitize user_id to prevent path traversal
+    safe_user_id = re.sub(r'[^\d]', '', str(update.effective_user.id))
 
-    if not entries:
+    # Get all of this user's diary ratings; the journal is only read the first time
+    if safe_user_id not in _DIARY_INDEX_LOADED:
+        try:
+            records = await _load_diary_records(safe_user_id)
+        except Exception as e:
+            logger.error(f"Error reading diary journal: {e}")
+            await update.message.reply_text("Error retrieving diary entries. Please try again later.")
+            return
+        # Merge rather than replace: entries saved while the journal was being read are newer
+        index = _DIARY_INDEX.setdefault(safe_user_id, {})
+        for date_str, record in records.items():
+            index.setdefault(date_str, (_display_date(record), record.get("rating", "?")))
+        _DIARY_INDEX_LOADED.add(safe_user_id)
+
+    index = _DIARY_INDEX[safe_user_id]
+    if not index:
         await update.message.reply_text("You don't have any diary entries yet. Start by creating your first entry!")
         return
 
-    # Display the most recent entries (limit to 10)
-    message = "*Your Recent Diary Entries:*\n\n"
-    for date_str, filename in entries[:10]:
-        # Format the date for display
-        try:
-            date_obj = datetime.datetime.strptime(date_str, '%Y-%m-%d')
-            formatted_date = date_obj.strftime('%A, %B %d, %Y')
+    # Pick the most recent entries (limit to 10), newest first, without sorting the rest;
+    # ISO dates compare chronologically as strings
+    entries = heapq.nlargest(10, index.items())
 
-            # Try to extract rating if present
-            diary_path = os.path.join(diary_dir, filename)
-            rating = "?"
-            try:
-                with open(diary_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    rating_match = re.search(r'Day Rating: (\d+)/10', content)
-                    if rating_match:
-                        rating = rating_match.group(1)
-            except Exception as e:
-                logger.error(f"Error reading diary file {filename}: {e}")
+    parts = ["*Your Recent Diary Entries:*\n\n"]
+    for date_str, (display_date, rating) in entries:
+        # Add command to read this diary entry; the display date was formatted when indexed
+        parts.append(f"📆 *{display_date}* (Rating: {rating}/10)\n")
+        parts.append(f"  /read_{date_str.replace('-', '')}\n\n")
 
-            # Add command to read this diary entry
-            message += f"📆 *{formatted_date}* (Rating: {rating}/10)\n"
-            message += f"  /read_{date_str.replace('-', '')}\n\n"
-        except Exception as e:
-            logger.error(f"Error processing diary entry {filename}: {e}")
-            message += f"📆 *{date_str}*\n"
-            message += f"  /read_{date_str.replace('-', '')}\n\n"
-
-    message += "Use the commands above to read a specific entry."
+    parts.append("Use the commands above to read a specific entry.")
+    message = "".join(parts)
     await update.message.reply_text(message, parse_mode="Markdown")
 
 
+@requires_auth
 async def read_diary(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Read a specific diary entry."""
-    user = update.effective_user
-    user_id = user.id
-
-    # Check authorization
-    if not is_authorized_user(user_id):
-        await update.message.reply_text(
-            f"🚫 Access Denied. Your user ID ({user_id}) is not authorized to use this bot."
-        )
-        return
-
     # Get the date from the command
     command = update.message.text
-    date_match = re.search(r'/read_(\d{8})', command)
+    date_match = READ_PATTERN.match(command)
 
     if not date_match:
         await update.message.reply_text(
@@ -783,33 +1060,28 @@ async def read_diary(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     date_str = date_match.group(1)
     formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
 
-    # Path to diary entry
-    diary_filename = f"{formatted_date}_diary.txt"
-    diary_path = os.path.join("DATA", "DiaryEntries", diary_filename)
-
-    # Check if file exists
-    if not os.path.exists(diary_path):
-        await update.message.reply_text(f"No diary entry found for {formatted_date}.")
-        return
-
-    # Read the entry
+    # Find the diary entry (sanitize user_id to prevent path traversal)
+    safe_user_id = re.sub(r'[^\d]', '', str(update.effective_user.id))
     try:
-        with open(diary_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        record = await _find_diary_record(safe_user_id, formatted_date)
+        if record is None:
+            await update.message.reply_text(f"No diary entry found for {formatted_date}.")
+            return
+
+        content = _format_diary_record(record)
 
         # Split content into chunks if too long for one message
         if len(content) > 4000:
-            chunks = [content[i:i + 4000] for i in range(0, len(content), 4000)]
             await update.message.reply_text(f"📖 *Diary Entry: {formatted_date}*\n", parse_mode="Markdown")
-            for chunk in chunks:
-                await update.message.reply_text(chunk)
+            for idx, chunk in enumerate(_chunks(content)):
+                await update.message.reply_text(chunk if idx == 0 else f"(continued {idx + 1})\n{chunk}")
         else:
             await update.message.reply_text(
                 f"📖 *Diary Entry: {formatted_date}*\n\n{content}",
                 parse_mode="Markdown"
             )
     except Exception as e:
-        logger.error(f"Error reading diary file {diary_filename}: {e}")
+        logger.error(f"Error reading diary entry {formatted_date}: {e}")
         await update.message.reply_text(f"Error reading diary entry for {formatted_date}. Please try again later.")
 
 
@@ -849,23 +1121,52 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
         )
 
 
+async def post_init(application: Application) -> None:
+    """Start background tasks once the bot's event loop is running."""
+    # The application isn't running yet, so the task is tracked here rather than by PTB
+    application.bot_data["fsync_task"] = asyncio.get_running_loop().create_task(_periodic_fsync())
+
+
+async def post_stop(application: Application) -> None:
+    """Stop background tasks before the event loop closes."""
+    fsync_task = application.bot_data.pop("fsync_task", None)
+    if fsync_task is not None:
+        fsync_task.cancel()
+        try:
+            await fsync_task
+        except asyncio.CancelledError:
+            pass
+
+
+async def post_shutdown(application: Application) -> None:
+    """Flush any journal writes that haven't been synced yet."""
+    await _sync_pending_journals()
+
+
 def main() -> None:
     """Set up and run the bot."""
     # Create the Application
-    application = Application.builder().token(config["telegram_bot_token"]).build()
+    application = (
+        Application.builder()
+        .token(config["telegram_bot_token"])
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Create conversation handler for diary entries
     conv_handler = ConversationHandler(
         entry_points=[
             CommandHandler("diary", start_diary),
-            MessageHandler(filters.Regex(r'^(hi|hello|hey)$'), handle_hello),
+            MessageHandler(filters.Regex(HELLO_PATTERN), handle_hello),
         ],
         states={
             WAITING_FOR_DIARY: [
                 MessageHandler(filters.TEXT & ~filters.COMMAND, process_diary_entry),
             ],
             WAITING_FOR_AUDIO_CHOICE: [
-                MessageHandler(filters.Regex(r'^(Yes|No)'), send_analysis),
+                MessageHandler(filters.Regex(AUDIO_CHOICE_PATTERN), send_analysis),
             ],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
@@ -881,7 +1182,7 @@ def main() -> None:
     application.add_handler(CommandHandler("mydiary", show_diary))
 
     # Add handler for diary read commands using regex
-    application.add_handler(MessageHandler(filters.Regex(r'^/read_\d{8}$'), read_diary))
+    application.add_handler(MessageHandler(filters.Regex(READ_PATTERN), read_diary))
 
     # Add handler for unknown commands
     application.add_handler(MessageHandler(filters.COMMAND, handle_unknown_command))
@@ -891,20 +1192,32 @@ def main() -> None:
 
     # Run the bot
     logger.info("Starting bot...")
-    application.run_polling()
+    # Every handler reads plain messages, so don't have Telegram send any other update types
+    application.run_polling(allowed_updates=[Update.MESSAGE])
 
 
 if __name__ == "__main__":
     # Create necessary directories if they don't exist
-    os.makedirs(os.path.join("DATA", "Diary"), exist_ok=True)
-    os.makedirs(os.path.join("DATA", "Audio"), exist_ok=True)
-    os.makedirs(os.path.join("DATA", "Users"), exist_ok=True)
-    os.makedirs(os.path.join("DATA", "DiaryEntries"), exist_ok=True)
+    for sub in ("Diary", "Audio", "Users", "DiaryEntries"):
+        Path("DATA", sub).mkdir(parents=True, exist_ok=True)
+
+    # Fold diary files from before the per-user journal into it
+    _import_legacy_diaries()
 
-    # Create default bio file if it doesn't exist
+    # Drop cached audio for anything other than the fixed cacheable texts
+    cache_dir = os.path.join("DATA", "AudioCache")
+    if os.path.isdir(cache_dir):
+        keep = {os.path.basename(_tts_cache_path(text, 'en')) for text in _CACHEABLE_TTS_TEXTS}
+        for name in os.listdir(cache_dir):
+            if name not in keep:
+                os.remove(os.path.join(cache_dir, name))
+
+    # Create default bio file if it doesn't exist ("x" fails instead of overwriting)
     default_bio_path = os.path.join("DATA", "Bio.txt")
-    if not os.path.exists(default_bio_path):
-        with open(default_bio_path, "w", encoding="utf-8") as f:
+    try:
+        with open(default_bio_path, "x", encoding="utf-8") as f:
             f.write("No personal information available yet.")
+    except FileExistsError:
+        pass
 
     main()